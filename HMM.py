@@ -5,9 +5,27 @@
 """
 from conllu import parse_incr
 import json
+import numpy as np
 import os
 import logging
-from collections import Counter # For counting vocabulary. Suggested by AI.
+
+def _train_kernel(tag_ids, start_counts, transition_counts, tag_counts):
+    """Adds the start, transition and tag counts of one sentence to the count arrays in place.
+
+    Works on integer arrays only, so no dict lookups or string hashing happen per token.
+
+    Args:
+        tag_ids: Array of tag indices (HMM.TAG2IDX) of the sentence, at least one element long
+        start_counts: Array of shape (N,) counting the first tag of every sentence
+        transition_counts: Array of shape (N, N) counting tag bigrams
+        tag_counts: Array of shape (N,) counting every tag
+    """
+    num_states = len(tag_counts)
+    start_counts[tag_ids[0]] += 1
+    # Every bigram (a, b) becomes the flat index a*N + b of the N x N matrix, so one bincount counts all of them
+    pair_ids = tag_ids[:-1] * num_states + tag_ids[1:]
+    transition_counts += np.bincount(pair_ids, minlength=num_states * num_states).reshape(num_states, num_states)
+    tag_counts += np.bincount(tag_ids, minlength=num_states)
 
 class HMM:
     UPOS_TAGS = [ # Universal Part of Speech Tags
@@ -29,104 +47,214 @@ class HMM:
         "VERB",  # Verb
         "X"      # Other
     ]
+    TAG2IDX = {tag: i for i, tag in enumerate(UPOS_TAGS)} # Row/column of every tag in the count arrays
 
     def __init__(self, vocabulary):
         self.states = self.UPOS_TAGS
         self.observations = vocabulary
-        
-        self.start_counts = {state: 0 for state in self.states}
-        self.transition_counts = {state: {state_to: 0 for state_to in self.states} for state in self.states}
-        self.emission_counts = {state: {} for state in self.states}
+        # Every word gets a monotonically increasing id. Words of the vocabulary come first, in the order of self.observations.
+        self.vocab = {word: i for i, word in enumerate(self.observations)}
+        num_states = len(self.states)
+
+        # Counts are kept in flat NumPy arrays indexed by TAG2IDX instead of nested dicts keyed by tag strings
+        self.start_counts = np.zeros(num_states, dtype=np.int64)
+        self.transition_counts = np.zeros((num_states, num_states), dtype=np.int64)
+        # Emissions are collected per sentence as (tag ids, word ids) coordinate arrays and only summed up in get_probabilities
+        self.emission_chunks = []
         
         self.total_first_words = 0
-        self.tag_counts = {state: 0 for state in self.states}
+        self.total_transitions = 0
+        self.tag_counts = np.zeros(num_states, dtype=np.int64)
 
-    def write_params(self, params, filepath="hmm_probabilities.json"):
+    def write_params(self, params, filepath="hmm_probabilities.npz"):
         """
-        Writes a given dictionary of parameters to a JSON file.
-        It accepts a 'params' dictionary as its primary data source. Writes to hmm_probabilities.json by default.
+        Writes a given dictionary of parameters to an NPZ or JSON file, depending on the suffix of filepath.
+        It accepts a 'params' dictionary as returned by get_probabilities(). Writes to hmm_probabilities.npz by default.
+        NPZ stores the probability arrays as float32 together with the states and the vocabulary.
+        For JSON the probability arrays are only turned into nested dicts (tag -> tag/word -> probability) here, at the JSON boundary.
         """
+        states = list(params['states'])
+        observations = list(params['observations']) # Json.dump() requires a list.
+        if filepath.endswith(".npz"):
+            np.savez_compressed(
+                filepath,
+                states=np.array(states),
+                vocab=np.array(observations),
+                start=params['start_prob'].astype(np.float32),
+                trans=params['trans_prob'].astype(np.float32),
+                emit=params['emit_prob'].astype(np.float32),
+            )
+            print(f"HMM parameters saved to {filepath}")
+            return
+
+        json_params = {
+            'states': states,
+            'observations': observations,
+            'start_prob': dict(zip(states, params['start_prob'].tolist())),
+            'trans_prob': {state: dict(zip(states, row)) for state, row in zip(states, params['trans_prob'].tolist())},
+            'emit_prob': {state: dict(zip(observations, row)) for state, row in zip(states, params['emit_prob'].tolist())},
+        }
         # Use a passed-through dictionary instead of building one. Fix to accompany the refactor of __main__
+        # Compact separators instead of indent=2: pretty-printing forces json onto its slow pure-Python encoder and doubles the file size
         with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(params, f, indent=2)
+            f.write(json.dumps(json_params, separators=(",", ":")))
         print(f"HMM parameters saved to {filepath}")
 
-    def _train_first(self, sentence_tags):
-        if not sentence_tags:
+    def train(self, sentence_word_tag_pairs):
+        if not sentence_word_tag_pairs:
+            return
+
+        # Encode tags and words in a single pass over the sentence; column 0 holds the tag ids, column 1 the word ids
+        tag2idx = self.TAG2IDX
+        vocab = self.vocab
+        ids = np.array([(tag2idx[tag], vocab.setdefault(word, len(vocab))) for word, tag in sentence_word_tag_pairs], dtype=np.int64)
+        self.train_ids(ids[:, 0], ids[:, 1])
+
+    def train_ids(self, tag_ids, word_ids):
+        """Trains on one sentence that is already encoded as integer arrays.
+
+        Args:
+            tag_ids: Array of tag indices (TAG2IDX)
+            word_ids: Array of word ids (self.vocab), same length as tag_ids
+        """
+        if len(tag_ids) == 0:
             return
-        first_tag = sentence_tags[0]
-        self.start_counts[first_tag] += 1
+
+        _train_kernel(tag_ids, self.start_counts, self.transition_counts, self.tag_counts)
         self.total_first_words += 1
+        self.total_transitions += len(tag_ids) - 1
 
-    def _train_trans(self, sentence_tags):
-        if len(sentence_tags) < 2:
-            return
-        for i in range(len(sentence_tags) - 1):
-            current_tag = sentence_tags[i]
-            next_tag = sentence_tags[i+1]
-            self.transition_counts[current_tag][next_tag] += 1
+        # Calculate emission counts
+        self.emission_chunks.append((tag_ids, word_ids))
 
-    def train(self, sentence_word_tag_pairs):
-        if not sentence_word_tag_pairs:
+    def train_corpus(self, tag_ids, word_ids, offsets):
+        """Trains on a whole corpus of encoded sentences at once, without a Python-level loop over the sentences.
+
+        Args:
+            tag_ids: Array of tag indices (TAG2IDX) of all tokens
+            word_ids: Array of word ids (self.vocab) of all tokens, same length as tag_ids
+            offsets: Array of sentence boundaries; sentence i spans offsets[i]:offsets[i+1]. Sentences must not be empty.
+        """
+        num_states = len(self.states)
+        num_sentences = len(offsets) - 1
+        if num_sentences <= 0:
             return
 
-        sentence_tags = [tag for word, tag in sentence_word_tag_pairs]
+        # First tag of every sentence
+        self.start_counts += np.bincount(tag_ids[offsets[:-1]], minlength=num_states)
+        self.total_first_words += num_sentences
 
-        self._train_first(sentence_tags)
-        self._train_trans(sentence_tags)
+        # Tag bigrams over the whole corpus, minus the pairs that cross from the last token of one sentence to the first of the next
+        within_sentence = np.ones(len(tag_ids) - 1, dtype=bool)
+        within_sentence[offsets[1:-1] - 1] = False
+        pair_ids = tag_ids[:-1][within_sentence].astype(np.int64) * num_states + tag_ids[1:][within_sentence]
+        self.transition_counts += np.bincount(pair_ids, minlength=num_states * num_states).reshape(num_states, num_states)
+        self.total_transitions += len(pair_ids)
 
-        for word, tag in sentence_word_tag_pairs:
-    
-            # Calculate emission counts
-            self.emission_counts[tag].setdefault(word, 0)
-            self.emission_counts[tag][word] += 1
-            
-            # Calculate tag counts
-            self.tag_counts[tag] += 1
+        self.tag_counts += np.bincount(tag_ids, minlength=num_states)
+        self.emission_chunks.append((tag_ids, word_ids))
         
     def get_probabilities(self):
         """
         Calculates the start, transition, and emission probabilities from the raw counts. 
         Laplace smoothing is implemented.
+        The probabilities are returned as arrays: start_prob (N,), trans_prob (N, N) and emit_prob (N, V),
+        with rows/columns in the order of 'states' and 'observations'.
         """
         num_states = len(self.states)
         vocabulary_size = len(self.observations)
 
         # Calculate Start Probabilities
-        start_prob = {}
-        for tag in self.states:
-            start_prob[tag] = (self.start_counts.get(tag, 0) + 1) / (self.total_first_words + num_states)
+        start_prob = (self.start_counts + 1) / (self.total_first_words + num_states)
 
         # Calculate Transition Probabilities
-        trans_prob = {state: {} for state in self.states}
-        for from_state in self.states:
-            total_transitions_from_state = sum(self.transition_counts.get(from_state, {}).values())
-
-            for to_state in self.states:
-                count = self.transition_counts.get(from_state, {}).get(to_state, 0)
-                trans_prob[from_state][to_state] = (count + 1) / (total_transitions_from_state + num_states)
+        # One vectorized divide over the whole matrix replaces the double loop over states
+        row_sums = self.transition_counts.sum(axis=1, keepdims=True)
+        trans_prob = (self.transition_counts + 1) / (row_sums + num_states)
 
         # Calculate Emission Probabilities
-        emit_prob = {state: {} for state in self.states}
-        for state in self.states:
-            total_emissions_from_state = self.tag_counts.get(state, 0)
-            denominator = total_emissions_from_state + vocabulary_size
-            
-            for word in self.observations:
-                count = self.emission_counts.get(state, {}).get(word, 0)
-                emit_prob[state][word] = (count + 1) / denominator
+        # Sum the collected (tag, word) coordinates into a dense count matrix. Every coordinate becomes the flat
+        # index tag*V + word of the N x V matrix, so a single bincount adds up all repeated coordinates.
+        num_words = len(self.vocab)
+        if self.emission_chunks:
+            emission_tag_ids, emission_word_ids = (np.concatenate(ids).astype(np.int64) for ids in zip(*self.emission_chunks))
+            pair_ids = emission_tag_ids * num_words + emission_word_ids
+        else:
+            pair_ids = np.empty(0, dtype=np.int64)
+        emission_counts = np.bincount(pair_ids, minlength=num_states * num_words).reshape(num_states, num_words)
+        # Only the words of the vocabulary get probabilities; their ids are 0..vocabulary_size-1
+        emit_prob = (emission_counts[:, :vocabulary_size] + 1) / (self.tag_counts[:, None] + vocabulary_size)
 
         # Return a new dictionary containing the probabilities
         prob_params = {
             'states': self.states,
-            'observations': list(self.observations), # Json.dump() requires a list.
+            'observations': list(self.vocab)[:vocabulary_size],
             'start_prob': start_prob,
             'trans_prob': trans_prob,
             'emit_prob': emit_prob,
         }
         return prob_params
 
-if __name__ == "__main__":
+# Columns of the CoNLL-U format up to the UPOS tag. Fields are matched by position.
+CONLLU_FIELDS = ("id", "form", "lemma", "upos")
+
+def read_corpus(filepath):
+    """
+    Reads a CoNLL-U file once and stores it as flat integer arrays, so training does not have to walk token dicts.
+    Word forms are lowercased. Multi-word tokens, empty nodes and tokens without form or UPOS tag are skipped.
+
+    Returns:
+        words: List of the distinct word forms; the word id of a form is its index in this list
+        word_ids: int32 array with the word id of every token
+        tag_ids: int32 array with the tag index (HMM.TAG2IDX) of every token
+        offsets: int32 array of sentence boundaries; sentence i spans offsets[i]:offsets[i+1]
+    """
+    word2id = {}
+    form2id = {} # Surface form -> word id, so every distinct form is lowercased only once
+    word_ids = []
+    tag_ids = []
+    offsets = [0]
+    with open(filepath, "r", encoding="utf-8") as f:
+        # Only the leading columns are needed; the parser leaves the rest of each line unparsed
+        for tokenlist in parse_incr(f, fields=CONLLU_FIELDS):
+            for token in tokenlist:
+                # Multi-word tokens have tuple ids and empty nodes have decimal ids, both are skipped
+                if type(token["id"]) is int and token["form"] and token["upostag"]:
+                    form = token["form"]
+                    word_id = form2id.get(form)
+                    if word_id is None:
+                        word_id = form2id[form] = word2id.setdefault(form.lower(), len(word2id))
+                    word_ids.append(word_id)
+                    tag_ids.append(HMM.TAG2IDX[token["upostag"]])
+            # Empty sentences get no entry
+            if len(word_ids) > offsets[-1]:
+                offsets.append(len(word_ids))
+
+    return list(word2id), np.asarray(word_ids, dtype=np.int32), np.asarray(tag_ids, dtype=np.int32), np.asarray(offsets, dtype=np.int32)
+
+def load_corpus(filepath, cache_path=None):
+    """
+    Same as read_corpus(), but keeps the parsed arrays in an .npz cache next to the CoNLL-U file.
+    The cache is used as long as it is newer than the CoNLL-U file, so parse_incr only runs again after the corpus changed.
+
+    Args:
+        filepath: Path of the CoNLL-U file
+        cache_path: Path of the cache file. Defaults to filepath with the extension replaced by .npz
+    """
+    if cache_path is None:
+        cache_path = os.path.splitext(filepath)[0] + ".npz"
+
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) > os.path.getmtime(filepath):
+        logging.info(f"Loading parsed corpus from {cache_path}")
+        with np.load(cache_path) as cache:
+            return cache["words"].tolist(), cache["word_ids"], cache["tag_ids"], cache["offsets"]
+
+    words, word_ids, tag_ids, offsets = read_corpus(filepath)
+    np.savez(cache_path, words=np.array(words, dtype=str), word_ids=word_ids, tag_ids=tag_ids, offsets=offsets)
+    logging.info(f"Parsed corpus cached in {cache_path}")
+    return words, word_ids, tag_ids, offsets
+
+def main():
     # The program flow was shown by AI. Specific variables and actions (e.g. <UNK> and the frequency threshold) shown by AI.
     training_file = "UD_English-GUM/en_gum-ud-train.conllu"
     # Define a frequency threshold for a word to be considered "known"
@@ -137,51 +265,42 @@ if __name__ == "__main__":
     if not os.path.exists(training_file):
         print(f"Error: Training file not found at {training_file}")
         print("Please ensure the CoNLL-U file is in the correct location.")
-        exit()
+        return
+
+    # Read the training file once into flat arrays. Stored to avoid reading file twice, and cached on disk for the next run.
+    words, corpus_word_ids, tag_ids, offsets = load_corpus(training_file)
 
     # Build the vocabulary (for smoothing)
     logging.info("Building vocabulary...")
-    word_frequencies = Counter()
-    all_sentences = [] # Store sentences to avoid reading file twice. Suggested by AI
-    # Read the training file
-    with open(training_file, "r", encoding="utf-8") as f:
-        for tokenlist in parse_incr(f):
-            sentence = []
-            for token in tokenlist:
-                if isinstance(token["id"], int) and token["form"] and token["upostag"]:
-                    word = token["form"].lower()
-                    sentence.append((word, token["upostag"]))
-                    word_frequencies[word] += 1
-            if sentence:
-                all_sentences.append(sentence)
-
-    # Create the final vocabulary
-    final_vocabulary = {word for word, freq in word_frequencies.items() if freq > FREQUENCY_THRESHOLD}
-    final_vocabulary.add(UNK_TOKEN)
+    word_frequencies = np.bincount(corpus_word_ids, minlength=len(words))
+
+    # Create the final vocabulary, most frequent words first so the busiest emission columns sit next to each other
+    by_frequency = np.argsort(-word_frequencies, kind="stable")
+    final_vocabulary = [words[i] for i in by_frequency if word_frequencies[i] > FREQUENCY_THRESHOLD]
+    final_vocabulary.append(UNK_TOKEN)
     
-    logging.info(f"Building vocabulary complete. Original words: {len(word_frequencies)}. Final vocabulary size: {len(final_vocabulary)}.")
+    logging.info(f"Building vocabulary complete. Original words: {len(words)}. Final vocabulary size: {len(final_vocabulary)}.")
 
     # Initialize the Model with the final vocabulary
     model = HMM(vocabulary=final_vocabulary)
 
+    # Replace rare words with the UNK_TOKEN. The lookup is done once per distinct word, then applied to all tokens at once.
+    unk_id = model.vocab[UNK_TOKEN]
+    corpus_to_model = np.array([model.vocab.get(word, unk_id) for word in words], dtype=np.int32)
+    word_ids = corpus_to_model[corpus_word_ids]
+
     # Train the Model
     logging.info("Training the HMM...")
-    for sentence in all_sentences:
-        processed_sentence = []
-        for word, tag in sentence:
-            # Replace rare words with the UNK_TOKEN
-            if word not in final_vocabulary:
-                processed_sentence.append((UNK_TOKEN, tag))
-            else:
-                processed_sentence.append((word, tag))
-        
-        if processed_sentence:
-            model.train(processed_sentence)
+    model.train_corpus(tag_ids, word_ids, offsets)
     
-    print(f"Training completed. Processed {len(all_sentences)} sentences.")
+    print(f"Training completed. Processed {len(offsets) - 1} sentences.")
     
     # Calculate and Save Probabilities
     print("Calculating probabilities...")
     # Dictionary containing probabilities
     final_params = model.get_probabilities()
-    model.write_params(final_params, "hmm_probabilities.json")
\ No newline at end of file
+    model.write_params(final_params, "hmm_probabilities.npz")
+
+
+if __name__ == "__main__":
+    main()
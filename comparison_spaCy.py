@@ -5,17 +5,20 @@ import glob
 import spacy
 import logging
 
-def process_file(nlp, path: str) -> str:
-    """Return a single file's annotation in CoNLL-U-like format."""
-    lines: list[str] = []
+def read_texts(paths: list[str]):
+    """Yield the contents of each file, one at a time."""
+    for path in paths:
+        with open(path, encoding="utf8") as f:
+            yield f.read()
 
-    text = open(path, encoding="utf8").read()
-    doc = nlp(text)
+def process_file(doc, path: str, out) -> None:
+    """Write a single file's annotation (an already parsed doc) in CoNLL-U-like format to out.
 
-    lines.append(f"# File: {path}\n")
+    Written sentence by sentence, so only one sentence's lines are held in memory at a time.
+    """
+    out.write(f"# File: {path}\n")
     for sent in doc.sents:
-        lines.append(f"# Sentence: {sent.text.strip()}")
-        lines.append("ID\tFORM\tLEMMA\tUPOS\tXPOS\tHEAD\tDEPREL")
+        lines = [f"# Sentence: {sent.text.strip()}", "ID\tFORM\tLEMMA\tUPOS\tXPOS\tHEAD\tDEPREL"]
         for token in sent:
             lines.append(
                 f"{token.i + 1}\t"
@@ -27,31 +30,32 @@ def process_file(nlp, path: str) -> str:
                 f"{token.dep_}"
             )
         lines.append("")  # blank line between sentences
+        out.write("\n" + "\n".join(lines))
 
     # Named-entity section (optional)
     if doc.ents:
-        lines.append("# Named Entities:")
+        out.write("\n# Named Entities:")
         for ent in doc.ents:
-            lines.append(f"{ent.text}\t{ent.label_}\t({ent.start_char},{ent.end_char})")
+            out.write(f"\n{ent.text}\t{ent.label_}\t({ent.start_char},{ent.end_char})")
 
     # Separator between files
-    lines.append("\n" + "=" * 80 + "\n")
-    return "\n".join(lines)
+    out.write("\n\n" + "=" * 80 + "\n")
 
 def main(folder: str) -> None:
     logging.critical("Started analysing - spaCy")
     nlp = spacy.load("en_core_web_trf")
     nlp.add_pipe("sentencizer", first=True)
 
-    conllu_chunks: list[str] = []
-    for path in glob.glob(os.path.join(folder, "*.txt")):
-        conllu_chunks.append(process_file(nlp, path))
+    paths = sorted(glob.glob(os.path.join(folder, "*.txt")))
+    # Each file is written as soon as it is parsed; the large buffer keeps the many small writes cheap
+    with open("comparison.conllu", "w", encoding="utf8", buffering=1 << 20) as out:
+        # nlp.pipe batches the documents through the transformer instead of calling nlp() once per file
+        for n, (path, doc) in enumerate(zip(paths, nlp.pipe(read_texts(paths), batch_size=8))):
+            if n:
+                out.write("\n")
+            process_file(doc, path, out)
     logging.critical("Finished analysing - spaCy")
 
-    # Dump everything once
-    with open("comparison.conllu", "w", encoding="utf8") as f:
-        f.write("\n".join(conllu_chunks))
-
 if __name__ == "__main__":
     logging.basicConfig(level=logging.CRITICAL, filename="log - spaCy.txt", filemode="w", format='%(asctime)s - %(levelname)s - %(message)s')
     if len(sys.argv) != 2:
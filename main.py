@@ -1,11 +1,19 @@
 import re
 import json
+import functools
+from concurrent.futures import ProcessPoolExecutor
 import tagging 
 import logging
 import stemmer
 import dictionaries
 import viterbi
 
+# Compiled once at import instead of going through re's pattern cache on every call
+_SENT_RE = re.compile('[.!?:;-]') # Sentence delimiters
+_WORD_RE = re.compile(r"\b[\w']+\b|[.,?!:;-]")
+# _WORD_RE only yields punctuation as single-character tokens, so a set probe finds them
+_PUNCT_SET = frozenset('.,?!:;-')
+
 class NLP:
     def __init__(self):
         """Self made; Regular expressions and comments done by AI"""
@@ -24,18 +32,17 @@ class NLP:
         }
         self.contraction_pattern = re.compile(r'\b(' + '|'.join(re.escape(key) for key in self.contractions.keys()) + r')\b')
         self.tagging = tagging.Tagging(dictionaries.patterns)  # Initialize Tagging with patterns and empty word_endings
+        # Words of these categories are not stemmed. One set, so each word needs a single lookup
+        self._skip_words = frozenset().union(*(dictionaries.patterns[key] for key in ('determiners', 'prepositions', 'conjunctions', 'pronouns', 'modals')))
 
-    def _stem(self, word):
-        stemmed, ending = self.stemmer.stem(word)
-        return stemmed, ending
-
-    def process(self, text):
+    def process(self, text, workers=None):
         """Main processing function to handle text input, split it into sentences, and preprocess each sentence.
         Args:
             text: String containing the text to process
+            workers: Number of worker processes for the sentences. None or 1 processes them in this process
         
         Returns:
-            processed_sentences: List of dictionaries containing processed sentences with their words, tags, and properties
+            processed_sentences: List of processed sentences, each a list of dictionaries with the words, tags, and properties
 
         Raises:
             ValueError: If the input is empty
@@ -50,26 +57,30 @@ class NLP:
         
         text = text.replace('\n', ' ')
         
-        # This will split on delimiters while preserving them
-        sentences = re.split('([.!?:;-])', text)
-        
-        processed_sentences = []
-        
-        # The re.split with a capturing group creates a list of [text, delim, text, delim, ...].
-        # This loop correctly pairs the text parts with their delimiters.
-        sentence_parts = sentences[::2]
-        delimiters = sentences[1::2]
+        sentences = []
 
-        for i, part in enumerate(sentence_parts):
-            delimiter = delimiters[i] if i < len(delimiters) else ""
-            full_sentence = (part + delimiter).strip()
+        # Every sentence runs up to and including its delimiter; the text after the last delimiter is a sentence of its own
+        sentence_ends = [match.end() for match in _SENT_RE.finditer(text)]
+        sentence_ends.append(len(text))
+
+        start = 0
+        for end in sentence_ends:
+            full_sentence = text[start:end].strip()
+            start = end
 
             # Skip empty sentences that might result from multiple delimiters
             if full_sentence:
-                processed_sentence = self.preprocess_sentence(full_sentence)
-                processed_sentences.append(processed_sentence)
-                
-        return processed_sentences
+                sentences.append(full_sentence)
+
+        if workers is not None and workers > 1:
+            # Sentences are independent. Every worker builds its own NLP once, map keeps the sentence order
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+                return list(executor.map(_preprocess_in_worker, sentences, chunksize=64))
+
+        # Repeated sentences (headers, boilerplate) are only split, stemmed and tagged once per call.
+        # The cache lives only as long as this call, so it does not keep the NLP instance or old results alive
+        cached_preprocess = functools.lru_cache(maxsize=4096)(self.preprocess_sentence)
+        return [_copy_records(cached_preprocess(full_sentence)) for full_sentence in sentences]
 
 
 
@@ -80,7 +91,7 @@ class NLP:
             sentence: String containing the sentence to process
             
         Returns:
-            Dictionary containing processed words with their tags and properties
+            List of dictionaries containing the processed words with their tags and properties
             
         Raises:
             ValueError: If there was an error processing the sentence
@@ -94,16 +105,21 @@ class NLP:
             raise ValueError("Input sentence cannot be empty")
             
         try:
-            # Handle contractions
-            sentence = self.contraction_pattern.sub(lambda x: self.contractions[x.group()], sentence)
+            # Handle contractions. Every contraction contains an apostrophe, so most sentences skip this pass
+            if "'" in sentence:
+                sentence = self.contraction_pattern.sub(lambda x: self.contractions[x.group()], sentence)
             
             # Split into words
-            words = re.findall(r"\b[\w']+\b|[.,?!:;-]", sentence.lower())
+            words = _WORD_RE.findall(sentence.lower())
             if not words:
                 raise ValueError("No valid words found in sentence")
                 
-            self.word_endings = {}
             stemmed_words = []
+            endings = [] # Ending removed from each stemmed word, same positions as stemmed_words
+
+            # Stem all words except punctuation and special categories, in one call for the sentence
+            skip_words = self._skip_words
+            stems = iter(zip(*self.stemmer.stem_many([word for word in words if word and word not in _PUNCT_SET and word not in skip_words])))
             
             # Process each word
             for word in words:
@@ -111,45 +127,42 @@ class NLP:
                 if not word:
                     continue
                     
-                if any(c in word for c in '.,?!:;-'):
-                    self.word_endings[word] = ''
+                if word in _PUNCT_SET:
                     stemmed_words.append(word)
+                    endings.append('')
                 else:
                     # Stem all words except special categories
-                    if word not in dictionaries.patterns['determiners'] and \
-                    word not in dictionaries.patterns['prepositions'] and \
-                    word not in dictionaries.patterns['conjunctions'] and \
-                    word not in dictionaries.patterns['pronouns'] and \
-                    word not in dictionaries.patterns['modals']:
-                        stemmed, ending = self._stem(word)
-                        logging.debug(f"Stemmed word is '{stemmed}', ending is '{ending}'")
+                    if word not in skip_words:
+                        stemmed, ending = next(stems)
+                        logging.debug("Stemmed word is '%s', ending is '%s'", stemmed, ending)
                         if stemmed:
-                            self.word_endings[stemmed] = ending  # Store ending for original word to use in tagging
                             stemmed_words.append(stemmed)
+                            endings.append(ending)  # Store ending for original word to use in tagging
                     else:
-                        self.word_endings[word] = ''
                         stemmed_words.append(word)
+                        endings.append('')
             
             if not stemmed_words:
                 raise ValueError("No valid words remained after preprocessing")
                 
             # Process words in context
-            processed_words = self._context(stemmed_words)
-            logging.debug(f"Processed words: {processed_words}")
+            processed_words = self._context(stemmed_words, endings)
+            logging.debug("Processed words: %s", processed_words)
 
             return processed_words
             
         except Exception as e:
             raise ValueError(f"Error processing text: {str(e)}")
 
-    def _context(self, sentence_list):
+    def _context(self, sentence_list, endings):
         """Process and tag words in context of the sentence.
         
         Args:
             sentence_list: List of stemmed words to process
+            endings: List of the endings the stemmer removed, one per word of sentence_list
             
         Returns:
-            Dictionary of tagged words with their properties
+            List of tagged words with their properties, one record per word in sentence order
             
         Raises:
             ValueError: If there's an error processing the words
@@ -163,49 +176,52 @@ class NLP:
             raise ValueError("Input list cannot be empty")
             
         try:
-            global tagged_words
-            tagged_words = {}
+            tagged_words = []
+            # The tagging rules look up earlier words by their form, so they get the latest record of every word
+            records_by_word = {}
+            # Two Nones on each side, so the surrounding words need no bounds checks
+            padded = [None, None] + sentence_list + [None, None]
+            # Bound once instead of looked up again for every word
+            tag_word = self.tagging._tag_word_in_context
+            append = tagged_words.append
             for i, word in enumerate(sentence_list):
                 if word is None or not isinstance(word, str):
                     continue
                     
-                # Get surrounding words with null checks
-                global prev_word, next_word, prev_prev_word, next_next_word
-
-                prev_word = sentence_list[i - 1] if i > 0 else None
-                next_word = sentence_list[i + 1] if i + 1 < len(sentence_list) else None
-                prev_prev_word = sentence_list[i - 2] if i > 1 else None
-                next_next_word = sentence_list[i + 2] if i + 2 < len(sentence_list) else None
+                # Get surrounding words; padded[i + 2] is the word itself
+                prev_prev_word = padded[i]
+                prev_word = padded[i + 1]
+                next_word = padded[i + 3]
+                next_next_word = padded[i + 4]
                 
-                # Get tag for the word
-                tagged_words[word] = {
+                # Get tag for the word. One record per token, filled in once the tag is known
+                record = records_by_word[word] = {
                     'word': word,
-                    'ending': self.word_endings.get(word, ''),
+                    'ending': endings[i],
                     'tag': None,
                     'type': None
                 }
                 try:
                     # Get tag for the word
-                    tag = self.tagging._tag_word_in_context(
+                    tag = tag_word(
                         word, 
                         prev_word, 
                         next_word, 
                         prev_prev_word, 
                         next_next_word, 
-                        tagged_words
+                        records_by_word
                     )
-                    logging.debug(f"The tag of the word '{word}' is '{tag}'.")
+                    logging.debug("The tag of the word '%s' is '%s'.", word, tag)
                 except Exception as e:
-                    logging.warning(f"Error tagging word '{word}': {str(e)}")
+                    logging.warning("Error tagging word '%s': %s", word, e)
+                    append(record)
                     continue
                 
                 # Store word information
-                logging.debug(f"word_endings are: {self.word_endings}")
-                tagged_words[word] = {
-                    'word': word,
-                    'ending': self.word_endings.get(word, ''),
-                    'tag': tag,
-                }
+                logging.debug("endings are: %s", endings)
+                record['tag'] = tag
+                del record['type']
+                append(record)
                 
             if not tagged_words:
                 raise ValueError("No words were successfully tagged")
@@ -215,6 +231,20 @@ class NLP:
         except Exception as e:
             raise ValueError(f"Error processing words in context: {str(e)}")
 
+def _copy_records(records):
+    """Copy the records of a cached sentence, so callers can change them without touching the cache."""
+    return [dict(record) for record in records]
+
+# Cached preprocess_sentence of a worker process in NLP.process, built once per worker by _init_worker
+_worker_preprocess = None
+
+def _init_worker():
+    global _worker_preprocess
+    _worker_preprocess = functools.lru_cache(maxsize=4096)(NLP().preprocess_sentence)
+
+def _preprocess_in_worker(sentence):
+    return _copy_records(_worker_preprocess(sentence))
+
 if __name__ == "__main__":
     """Logging by AI"""
     logging.basicConfig(level=logging.CRITICAL, filename="log.txt", filemode="w", format='%(asctime)s - %(levelname)s - %(message)s')
@@ -238,11 +268,11 @@ if __name__ == "__main__":
         results = nlp.process(user_input)
         logging.critical("Finished analysing - Rule-based")
         with open("rb_raw.txt", "w") as f:
-            json.dump(results, f)
+            f.write(json.dumps(results))
         print("\nProcessed sentences:")
-        for i, sentence_dict in enumerate(results, 1):
+        for i, sentence_records in enumerate(results, 1):
             print(f"\nSentence {i}:")
-            print("Words:", {word: info for word, info in sentence_dict.items()})
+            print("Words:", sentence_records)
     elif model_input.lower() == "hmm":
         viterbi = viterbi.Viterbi()
         print("Enter text to process (press \\end to finish):")
@@ -262,7 +292,7 @@ if __name__ == "__main__":
         results = viterbi.process(user_input)
         logging.critical("Finished analysing")
         with open("viterbi_raw.txt", "w") as f:
-            json.dump(results, f)
+            f.write(json.dumps(results))
         print(results)
     else:
         print("Invalid input")
\ No newline at end of file
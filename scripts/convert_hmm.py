@@ -5,62 +5,61 @@ comparable with the UD_English-GUM format for evaluation.
 """
 
 import sys
-import json
+from tagged_json import iter_json_array
+
+VALID_UD_TAGS = frozenset({
+    "ADJ", "ADP", "ADV", "AUX", "CCONJ", "DET", "INTJ",
+    "NOUN", "NUM", "PART", "PRON", "PROPN", "PUNCT",
+    "SCONJ", "SYM", "VERB", "X"
+})
+# Every valid tag maps to itself, so the conversion is a single dict lookup like RB2UD in convert_rb.py
+_UD_PASSTHROUGH = {tag: tag for tag in VALID_UD_TAGS}
 
 def convert_tag_to_ud(tag):
     """
     Convert HMM tagger's tag format to Universal Dependencies format.
     Since the HMM tagger already uses UD tags, this is mostly a pass-through.
     """
-    valid_ud_tags = {
-        "ADJ", "ADP", "ADV", "AUX", "CCONJ", "DET", "INTJ",
-        "NOUN", "NUM", "PART", "PRON", "PROPN", "PUNCT",
-        "SCONJ", "SYM", "VERB", "X"
-    }
-    
-    return tag if tag in valid_ud_tags else "X"
+    return _UD_PASSTHROUGH.get(tag, "X")
 
-def convert_to_conllu_format(tagged_data):
+def iter_conllu(tagged_data):
     """
-    Convert the HMM tagger data to CoNLL-U format.
+    Yield the CoNLL-U lines for the HMM tagger data, without line breaks.
     
     Input format:
     [[["this", "PRON"], ["is", "AUX"], ["a", "DET"], ["test", "NOUN"]]]
     
-    Output is CoNLL-U formatted text.
+    Every sentence ends with an empty line.
     """
-    output_lines = []
-    
     # Start with document header
-    output_lines.append("# newdoc id = converted_hmm_tagger")
-    output_lines.append("# newpar")
-    
-    current_sent_id = 1
+    yield "# newdoc id = converted_hmm_tagger"
+    yield "# newpar"
     
     # Process each sentence
-    for sentence in tagged_data:
-        # Add sentence header
-        output_lines.append(f"# sent_id = {current_sent_id}")
-        current_sent_id += 1
-        
-        # Reconstruct the original text
-        words = [word_tag[0] for word_tag in sentence]
-        text = ' '.join(words)
-        output_lines.append(f"# text = {text}")
+    for sent_id, sentence in enumerate(tagged_data, 1):
+        # Add sentence header and reconstruct the original text
+        yield f"# sent_id = {sent_id}"
+        yield "# text = " + " ".join(word for word, _ in sentence)
         
         # Add each token
         for token_id, (word, tag) in enumerate(sentence, 1):
             # Convert to UD tag if needed (already should be UD format)
-            ud_tag = convert_tag_to_ud(tag)
-            
             # Format: ID FORM LEMMA UPOS XPOS FEATS HEAD DEPREL DEPS MISC
-            token_line = f"{token_id}\t{word}\t_\t{ud_tag}\t_\t_\t_\t_\t_\t_"
-            output_lines.append(token_line)
+            yield f"{token_id}\t{word}\t_\t{convert_tag_to_ud(tag)}\t_\t_\t_\t_\t_\t_"
         
         # Add sentence separator
-        output_lines.append("")
+        yield ""
+
+def convert_to_conllu_format(tagged_data):
+    """
+    Convert the HMM tagger data to CoNLL-U format.
+    
+    Input format:
+    [[["this", "PRON"], ["is", "AUX"], ["a", "DET"], ["test", "NOUN"]]]
     
-    return "\n".join(output_lines)
+    Output is CoNLL-U formatted text.
+    """
+    return "\n".join(iter_conllu(tagged_data))
 
 def main():
     if len(sys.argv) != 3:
@@ -71,13 +70,9 @@ def main():
     output_file = sys.argv[2]
     
     try:
-        with open(input_file, 'r', encoding='utf-8') as f:
-            tagged_data = json.load(f)
-        
-        conllu_output = convert_to_conllu_format(tagged_data)
-        
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(conllu_output)
+        # Read and written one sentence at a time, neither the input nor the output is held in memory as a whole
+        with open(input_file, 'r', encoding='utf-8') as f, open(output_file, 'w', encoding='utf-8', buffering=1 << 20) as out:
+            out.writelines(line + "\n" for line in iter_conllu(iter_json_array(f)))
         
         print(f"Conversion complete. Output written to {output_file}")
     
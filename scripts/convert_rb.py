@@ -1,14 +1,17 @@
 #!/usr/bin/env python3
 """
 Convert rule-based tagger JSON -> CoNLL-U.
-Handles both
+Handles
+  [ [ {'word': 'this', ...}, {'word': 'is', ...} ], # list of sentences,
+    [ ... ], ... ]                                  # one record per token (main.py)
+and the older word-keyed output
   { 'this': {...}, 'is': {...}, ... }               # single sentence
-and
   [ { 'this': {...}, 'is': {...}, ... },            # list of sentences
     { ... }, ... ]
 """
 
-import sys, json, collections
+import io, sys, json, collections.abc
+from tagged_json import iter_json_array
 
 # ----------------- mapping -----------------
 RB2UD = {
@@ -30,47 +33,80 @@ def rb2ud(tag):
     return RB2UD.get(tag, "X")
 
 # ------------- CoNLL-U builder -------------
-def sentence_dict_to_conllu(sent_dict, sent_id):
+def is_record(item):
+    """a token record {'word': 'this', 'tag': ...} as written by main.py"""
+    return isinstance(item, collections.abc.Mapping) and isinstance(item.get("word"), str)
+
+def sentence_dict_to_conllu(sent, sent_id):
     """
-    sent_dict : {'word1': {...}, 'word2': {...}, ...}
-    returns   : list[str]  (one CoNLL-U sentence incl. blank line)
+    sent    : [{'word': 'word1', ...}, {'word': 'word2', ...}, ...]
+              or the older {'word1': {...}, 'word2': {...}, ...}
+    returns : list[str]  (one CoNLL-U sentence incl. blank line)
     """
-    # insertion order of dicts is preserved in Py 3.7+, so this keeps token order
-    words = list(sent_dict.keys())
+    if isinstance(sent, collections.abc.Mapping):
+        # insertion order of dicts is preserved in Py 3.7+, so this keeps token order
+        sent = [dict(info, word=w) for w, info in sent.items()]
+    words = [rec["word"] for rec in sent]
     lines = [f"# sent_id = {sent_id}",
              f"# text = {' '.join(words)}"]
 
-    for i, w in enumerate(words, 1):
-        ud = rb2ud(sent_dict[w].get("tag", "uncertain"))
-        lines.append(f"{i}\t{w}\t_\t{ud}\t_\t_\t_\t_\t_\t_")
+    rb_get = RB2UD.get          # bound once, same lookup as rb2ud
+    append = lines.append
+    for i, rec in enumerate(sent, 1):
+        ud = rb_get(rec.get("tag", "uncertain"), "X")
+        append(f"{i}\t{rec['word']}\t_\t{ud}\t_\t_\t_\t_\t_\t_")
 
     lines.append("")            # blank line after each sentence
     return lines
 
-def convert(obj):
+def iter_sentences(f):
+    """
+    f      : rule-based tagger JSON file, in any of the formats above
+    yields : the sentences one at a time, a single sentence as the only item
     """
-    obj is either a dict (one sentence) or list[dict] (many sentences)
-    returns full CoNLL-U string
+    items = iter_json_array(f)
+    try:
+        first = next(items, None)
+    except ValueError:          # not an array: one word-keyed sentence
+        f.seek(0)
+        yield json.load(f)
+        return
+    if first is None:
+        return
+    if is_record(first):        # one sentence of records
+        yield [first, *items]
+        return
+    yield first
+    yield from items
+
+def convert(obj, out):
     """
-    if isinstance(obj, collections.abc.Mapping):
+    obj is one sentence (list of records or word-keyed dict) or a list (or any iterable) of sentences
+    writes the CoNLL-U lines to the text file out, one sentence at a time
+    """
+    if isinstance(obj, collections.abc.Mapping) or (isinstance(obj, list) and obj and is_record(obj[0])):
         obj = [obj]             # wrap single sentence as list
 
-    lines = ["# newdoc id = converted_rule_based", "# newpar"]
+    out.write("# newdoc id = converted_rule_based\n# newpar\n")
     for sid, sent in enumerate(obj, 1):
-        lines.extend(sentence_dict_to_conllu(sent, sid))
-    return "\n".join(lines)
+        out.write("\n".join(sentence_dict_to_conllu(sent, sid)))
+        out.write("\n")
+
+def convert_to_string(obj):
+    """
+    same as convert, returns full CoNLL-U string
+    """
+    buf = io.StringIO()
+    convert(obj, buf)
+    return buf.getvalue()
 
 # ----------------- CLI -----------------
 if __name__ == "__main__":
     if len(sys.argv) != 3:
         sys.exit(f"Usage: {sys.argv[0]} input.json output.conllu")
 
-    with open(sys.argv[1], encoding="utf-8") as f:
-        data = json.load(f)
-
-    conllu = convert(data)
-
-    with open(sys.argv[2], "w", encoding="utf-8") as f:
-        f.write(conllu)
+    # the sentences are read and written one at a time, the whole file is never held in memory
+    with open(sys.argv[1], encoding="utf-8") as f, open(sys.argv[2], "w", encoding="utf-8", buffering=1 << 20) as out:
+        convert(iter_sentences(f), out)
 
     print("✓ Conversion finished:", sys.argv[2])
@@ -0,0 +1,65 @@
+"""
+Read the items of a top-level JSON array one at a time.
+The tagger output files are one array of sentences; the converters only
+ever need one sentence at a time, so the whole file is never loaded.
+"""
+
+import re
+import json
+
+_WHITESPACE = re.compile(r"\s*")
+
+def iter_json_array(f, chunk_size=1 << 16):
+    """
+    f          : text file whose content is a JSON array
+    chunk_size : number of characters read at a time
+    yields     : the items of the array, in order
+
+    Raises ValueError if the file is not a JSON array.
+    """
+    decoder = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
+    in_array = False
+    after_item = False          # an item was read, "," or "]" must follow
+    after_comma = False         # a "," was read, an item must follow
+
+    while True:
+        pos = _WHITESPACE.match(buf, pos).end()
+        if pos == len(buf):
+            if eof:
+                raise ValueError("Unexpected end of JSON array")
+            chunk = f.read(chunk_size)
+            buf, pos, eof = buf[pos:] + chunk, 0, not chunk
+            continue
+
+        c = buf[pos]
+        if not in_array:
+            if c != "[":
+                raise ValueError("Expected a JSON array")
+            in_array = True
+            pos += 1
+        elif c == "]" and not after_comma:
+            return
+        elif after_item:
+            if c != ",":
+                raise ValueError("Expected ',' or ']' in JSON array")
+            after_item, after_comma = False, True
+            pos += 1
+        else:
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                end = len(buf)
+            # an item is only complete once the "," or "]" after it has been read:
+            # a number cut after "2." or "1e" decodes as 2 or 1, but goes on in the next chunk
+            after = _WHITESPACE.match(buf, end).end()
+            if not eof and (after == len(buf) or (after == end and buf[end] not in ",]")):
+                # read more and decode the item again
+                chunk = f.read(chunk_size)
+                buf, pos, eof = buf[pos:] + chunk, 0, not chunk
+                continue
+            yield item
+            pos = end
+            after_item, after_comma = True, False
@@ -1,21 +1,78 @@
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+# Byte value -> 1 for consonants, 0 for vowels. 'y' is fixed up separately, it depends on the character before it
+_CONS_TABLE = bytes(0 if chr(c) in "aeiou" else 1 for c in range(256))
+
+# Most words kept in Stemmer._cache, as many as the lru_cache NLP used to keep around stem
+CACHE_SIZE = 65536
+
+# A vowel followed by a consonant in the classification of a word
+_VC = b"\x00\x01"
+
+def _classify(s):
+    """Return 1 for every consonant and 0 for every vowel of s, with 'y' counted as a consonant."""
+    if s.isascii():
+        return s.encode("ascii").translate(_CONS_TABLE)
+    return bytes(0 if c in "aeiou" else 1 for c in s)
+
+# Suffixes of steps 2 and 3 with their replacements, keyed by the last letter of the word.
+# Within a letter the suffixes are tried in order and the first one the word ends with is used.
+_STEP2_SUFFIXES = {
+    'l': (("ational", "ate"), ("tional", "tion")),
+    'i': (("enci", "ence"), ("anci", "ance"), ("izer", "ize"), ("abli", "able"), ("alli", "al"),
+          ("entli", "ent"), ("eli", "e"), ("ousli", "ous")),
+    'n': (("ization", "ize"), ("ation", "ate")),
+    'r': (("ator", "ate"),),
+    'm': (("alism", "al"),),
+    's': (("iveness", "ive"), ("fulness", "ful"), ("ousness", "ous")),
+    't': (("aliti", "al"), ("iviti", "ive"), ("biliti", "ble")),
+    'g': (("logi", "log"),),
+}
+_STEP3_SUFFIXES = {
+    'e': (("icate", "ic"), ("ative", ""), ("alize", "al")),
+    'i': (("iciti", "ic"),),
+    'l': (("ical", "ic"), ("ful", "")),
+    's': (("ness", ""),),
+}
+# Suffixes removed in step 4, keyed by the second to last letter of the word
+_STEP4_SUFFIXES = {
+    'a': ("al",),
+    'c': ("ance", "ence"),
+    'e': ("er",),
+    'i': ("ic",),
+    'l': ("able", "ible"),
+    'n': ("ant", "ement", "ment", "ent"),
+    'o': ("ion", "ou"),
+    's': ("ism",),
+    't': ("ate", "iti"),
+    'u': ("ous",),
+    'v': ("ive",),
+    'z': ("ize",),
+}
+
 class Stemmer(object):
     """Stemmer class for stemming words.
 
     Attributes:
-        b (list): List of characters in the word
+        b (str): The word being stemmed; only b[k0:k+1] is still part of the stem
+        cons (bytearray): 1 for every consonant in b, 0 for every vowel
         k (int): Index of the current character in the word
         k0 (int): Index of the first character in the word
         j (int): Index of the last character in the word
         _dirty_ending_tracker (str): String containing the stemmed word and the removed suffix
+        _cache (dict): Stem and removed suffix of the last CACHE_SIZE words stemmed, oldest first
     
     Some of the explanation of the Porter stemmer and terms and keywords by AI, implementation by me. Docstrings by AI.
     """
     def __init__(self):
-        self.b = [] 
+        self.b = "" 
+        self.cons = bytearray()
         self.k = 0  
         self.k0 = 0 
         self.j = 0  
         self._dirty_ending_tracker = ""
+        self._cache = {}
 
     def _cons(self, i):
         """Check if the character at index i is a consonant.
@@ -26,16 +83,36 @@ class Stemmer(object):
         Returns:
             True if the character is a consonant, False otherwise
         """
-        if self.b[i] == 'a' or self.b[i] == 'e' or \
-           self.b[i] == 'i' or self.b[i] == 'o' or \
-           self.b[i] == 'u':
-            return False
-        if self.b[i] == 'y':
-            if i == self.k0:
-                return True
-            else:
-                return (not self._cons(i - 1))
-        return True
+        return self.cons[i] == 1
+
+    def _set_cons(self, start):
+        """Classify the characters of the word from index start on as consonants (1) or vowels (0).
+        Called when the word is loaded and again from the first changed index whenever the word is changed.
+        
+        Args:
+            start: Index of the first character to classify
+        """
+        tail = self.b[start:]
+        cons = self.cons
+        del cons[start:]
+        cons += _classify(tail)
+        if "y" in tail:
+            self._fix_y(tail, start)
+
+    def _fix_y(self, tail, start):
+        """Classify the y's in tail, which starts at index start of the word.
+        A 'y' is a consonant at the start of the word or after a vowel, so they are fixed up from left to right.
+        
+        Args:
+            tail: Part of the word that was classified by _classify
+            start: Index of tail in the word
+        """
+        cons = self.cons
+        i = tail.find("y")
+        while i != -1:
+            pos = start + i
+            cons[pos] = 1 if pos == self.k0 else 1 - cons[pos - 1]
+            i = tail.find("y", i + 1)
 
     def _m(self):
         """Measure the number of consonant sequences between k0 and j.
@@ -43,31 +120,8 @@ class Stemmer(object):
         Returns:
             Number of consonant sequences between k0 and j
         """
-        n = 0
-        i = self.k0
-        while True:
-            if i > self.j:
-                return n
-            if not self._cons(i):
-                break
-            i += 1
-        i += 1
-        while True:
-            while True:
-                if i > self.j:
-                    return n
-                if self._cons(i):
-                    break
-                i += 1
-            i += 1
-            n += 1
-            while True:
-                if i > self.j:
-                    return n
-                if not self._cons(i):
-                    break
-                i += 1
-            i += 1
+        # Every vowel directly followed by a consonant ends one VC sequence, so m is the number of 0, 1 pairs in cons
+        return self.cons.count(_VC, self.k0, self.j + 1)
 
     def _vowelinstem(self):
         """Check if there is a vowel in the stem.
@@ -75,10 +129,7 @@ class Stemmer(object):
         Returns:
             True if there is a vowel in the stem, False otherwise
         """
-        for i in range(self.k0, self.j + 1):
-            if not self._cons(i):
-                return True
-        return False
+        return 0 in self.cons[self.k0:self.j + 1]
 
     def _doublec(self, idx):
         """Check if the character at idx and idx-1 are the same consonant.
@@ -122,13 +173,10 @@ class Stemmer(object):
         Returns:
             True if the word ends with the string, False otherwise
         """
-        length = len(s_str)
-        s_list = list(s_str)
-        if length > (self.k - self.k0 + 1):
-            return False
-        if self.b[self.k-length+1 : self.k+1] != s_list:
+        # endswith limited to b[k0:k+1] also fails when s_str is longer than the stem
+        if not self.b.endswith(s_str, self.k0, self.k + 1):
             return False
-        self.j = self.k - length
+        self.j = self.k - len(s_str)
         return True
 
     def _setto(self, s_str):
@@ -137,10 +185,9 @@ class Stemmer(object):
         Args:
             s_str: String to set the end of the word to
         """
-        s_list = list(s_str)
-        length = len(s_list)
-        self.b[self.j+1 : self.k+1] = s_list
-        self.k = self.j + length
+        self.b = self.b[:self.j+1] + s_str + self.b[self.k+1:]
+        self.k = self.j + len(s_str)
+        self._set_cons(self.j + 1)
 
     def _step1ab(self):
         """Perform step 1a and 1b of the stemming algorithm."""
@@ -161,18 +208,9 @@ class Stemmer(object):
                     self._dirty_ending_tracker = "eed"
                     self.k -= 1
             elif self._ends("ed") or self._ends("ing"):
-                original_suffix = "".join(self.b[self.j+1 : self.k+1])
+                original_suffix = self.b[self.j+1 : self.k+1]
                 
-                original_k_val = self.k 
-                self.k = self.j 
-                contains_vowel = False
-                for i_char_idx in range(self.k0, self.j + 1):
-                    if not self._cons(i_char_idx):
-                        contains_vowel = True
-                        break
-                self.k = original_k_val
-
-                if contains_vowel:
+                if 0 in self.cons[self.k0:self.j + 1]: # Vowel in the stem before the suffix
                     self.k = self.j 
                     self._dirty_ending_tracker = original_suffix
                     if self._ends("at"):
@@ -188,154 +226,50 @@ class Stemmer(object):
                         original_j_val = self.j 
                         self.j = self.k 
                         if self._m() == 1 and self._cvc(self.k):
-                            self.b.append('e')
+                            self.b += 'e'
+                            self._set_cons(len(self.b) - 1)
                             self.k +=1
                         self.j = original_j_val
 
     def _step1c(self):
         """Perform step 1c of the stemming algorithm."""
         if self._ends("y"):
-            contains_vowel = False
-            for i_char_idx in range(self.k0, self.j + 1):
-                if not self._cons(i_char_idx):
-                    contains_vowel = True
-                    break
+            contains_vowel = 0 in self.cons[self.k0:self.j + 1]
             if contains_vowel:
                 self._dirty_ending_tracker = "y"
                 self._setto("i")
 
     def _step2(self):
         """Perform step 2 of the stemming algorithm."""
-        s1, s2 = "", ""
-        if self.b[self.k] == 'l':
-            if self._ends("ational"): s1, s2 = "ational", "ate"
-            elif self._ends("tional"): s1, s2 = "tional", "tion"
-            else: return
-        elif self.b[self.k] == 'i':
-            if self._ends("enci"): s1, s2 = "enci", "ence"
-            elif self._ends("anci"): s1, s2 = "anci", "ance"
-            elif self._ends("izer"): s1, s2 = "izer", "ize"
-            elif self._ends("abli"): s1, s2 = "abli", "able" 
-            elif self._ends("alli"): s1, s2 = "alli", "al"
-            elif self._ends("entli"): s1, s2 = "entli", "ent"
-            elif self._ends("eli"): s1, s2 = "eli", "e"
-            elif self._ends("ousli"): s1, s2 = "ousli", "ous"
-            else: return
-        elif self.b[self.k] == 'n':
-            if self._ends("ization"): s1, s2 = "ization", "ize"
-            elif self._ends("ation"): s1, s2 = "ation", "ate"
-            else: return
-        elif self.b[self.k] == 'r':
-            if self._ends("ator"): s1, s2 = "ator", "ate"
-            else: return
-        elif self.b[self.k] == 'm':
-            if self._ends("alism"): s1, s2 = "alism", "al"
-            else: return
-        elif self.b[self.k] == 's':
-            if self._ends("iveness"): s1, s2 = "iveness", "ive"
-            elif self._ends("fulness"): s1, s2 = "fulness", "ful"
-            elif self._ends("ousness"): s1, s2 = "ousness", "ous"
-            else: return
-        elif self.b[self.k] == 't':
-            if self._ends("aliti"): s1, s2 = "aliti", "al"
-            elif self._ends("iviti"): s1, s2 = "iviti", "ive"
-            elif self._ends("biliti"): s1, s2 = "biliti", "ble"
-            else: return
-        elif self.b[self.k] == 'g':
-             if self._ends("logi"): s1, s2 = "logi", "log"
-             else: return
-        else:
-            return
-        
-        if self._m() > 0:
-            self._dirty_ending_tracker = s1
-            self._setto(s2)
+        for s1, s2 in _STEP2_SUFFIXES.get(self.b[self.k], ()):
+            if self._ends(s1):
+                if self._m() > 0:
+                    self._dirty_ending_tracker = s1
+                    self._setto(s2)
+                return
 
     def _step3(self):
         """Perform step 3 of the stemming algorithm."""
-        s1, s2 = "", ""
-        if self.b[self.k] == 'e':
-            if self._ends("icate"): s1, s2 = "icate", "ic"
-            elif self._ends("ative"): s1, s2 = "ative", "" 
-            elif self._ends("alize"): s1, s2 = "alize", "al"
-            else: return
-        elif self.b[self.k] == 'i':
-            if self._ends("iciti"): s1, s2 = "iciti", "ic"
-            else: return
-        elif self.b[self.k] == 'l':
-            if self._ends("ical"): s1, s2 = "ical", "ic"
-            elif self._ends("ful"): s1, s2 = "ful", ""
-            else: return
-        elif self.b[self.k] == 's':
-            if self._ends("ness"): s1, s2 = "ness", ""
-            else: return
-        else:
-            return
-
-        if self._m() > 0:
-            self._dirty_ending_tracker = s1
-            self._setto(s2)
+        for s1, s2 in _STEP3_SUFFIXES.get(self.b[self.k], ()):
+            if self._ends(s1):
+                if self._m() > 0:
+                    self._dirty_ending_tracker = s1
+                    self._setto(s2)
+                return
 
     def _step4(self):
         """Perform step 4 of the stemming algorithm."""
-        s1 = ""
         if self.k <= self.k0: return # Word too short for k-1 access
 
-        char_k_minus_1 = self.b[self.k-1] 
-
-        if char_k_minus_1 == 'a':
-            if self._ends("al"): s1 = "al"
-            else: return
-        elif char_k_minus_1 == 'c':
-            if self._ends("ance"): s1 = "ance"
-            elif self._ends("ence"): s1 = "ence"
-            else: return
-        elif char_k_minus_1 == 'e':
-            if self._ends("er"): s1 = "er"
-            else: return
-        elif char_k_minus_1 == 'i':
-            if self._ends("ic"): s1 = "ic"
-            else: return
-        elif char_k_minus_1 == 'l':
-            if self._ends("able"): s1 = "able"
-            elif self._ends("ible"): s1 = "ible"
-            else: return
-        elif char_k_minus_1 == 'n':
-            if self._ends("ant"): s1 = "ant"
-            elif self._ends("ement"): s1 = "ement"
-            elif self._ends("ment"): s1 = "ment"
-            elif self._ends("ent"): s1 = "ent"
-            else: return
-        elif char_k_minus_1 == 'o':
-            if self._ends("ion"): 
-                if self.j > self.k0 and (self.b[self.j] == 's' or self.b[self.j] == 't'):
-                    s1 = "ion" 
-                else: 
-                    return 
-            elif self._ends("ou"): s1 = "ou"
-            else: return
-        elif char_k_minus_1 == 's':
-            if self._ends("ism"): s1 = "ism"
-            else: return
-        elif char_k_minus_1 == 't':
-            if self._ends("ate"): s1 = "ate"
-            elif self._ends("iti"): s1 = "iti"
-            else: return
-        elif char_k_minus_1 == 'u':
-            if self._ends("ous"): s1 = "ous"
-            else: return
-        elif char_k_minus_1 == 'v':
-            if self._ends("ive"): s1 = "ive"
-            else: return
-        elif char_k_minus_1 == 'z':
-            if self._ends("ize"): s1 = "ize"
-            else: return
-        else:
-            return
-
-        if s1 and self._m() > 1:
-            self._dirty_ending_tracker = s1
-            self._setto("") 
+        for s1 in _STEP4_SUFFIXES.get(self.b[self.k-1], ()):
+            if self._ends(s1):
+                # -ion is only removed after s or t
+                if s1 == "ion" and not (self.j > self.k0 and self.b[self.j] in "st"):
+                    return
+                if self._m() > 1:
+                    self._dirty_ending_tracker = s1
+                    self._setto("")
+                return
 
     def _step5a(self):
         """Perform step 5a of the stemming algorithm."""
@@ -360,6 +294,29 @@ class Stemmer(object):
 
     def stem(self, word):
         """Stem the given word and return the stem and the removed suffix.
+        The result only depends on the word, so every word is stemmed once and then answered from the cache.
+        
+        Args:
+            word: String to stem
+            
+        Returns:
+            Stemmed word and the removed suffix
+        """
+        cache = self._cache
+        result = cache.get(word)
+        if result is None:
+            if len(cache) >= CACHE_SIZE:
+                # Dicts keep insertion order, so the first key is the word stemmed longest ago
+                del cache[next(iter(cache))]
+            result = cache[word] = self._stem_uncached(word)
+        return result
+
+    def clear_cache(self):
+        """Forget all cached stems."""
+        self._cache.clear()
+
+    def _stem_uncached(self, word):
+        """Run the Porter steps on the given word.
         
         Args:
             word: String to stem
@@ -370,9 +327,12 @@ class Stemmer(object):
         if not word or len(word) <= 2:
             return word, ""
         
-        self.b = list(word)
+        self.b = word
         self.k = len(word) - 1 
         self.k0 = 0
+        self.cons = bytearray(_classify(word))
+        if "y" in word:
+            self._fix_y(word, 0)
         self._dirty_ending_tracker = ""
 
         self._step1ab()
@@ -389,6 +349,56 @@ class Stemmer(object):
         if self.k > self.k0 :
             self._step5b()
         
-        final_stem = "".join(self.b[self.k0:self.k+1])
+        final_stem = self.b[self.k0:self.k+1]
+        
+        # Many words share a stem; interned, equal stems are one object and compare by identity as dict keys
+        return sys.intern(final_stem), sys.intern(self._dirty_ending_tracker)
+
+    def stem_many(self, words):
+        """Stem a list of words in one call.
         
-        return final_stem, self._dirty_ending_tracker
\ No newline at end of file
+        Args:
+            words: List of strings to stem
+            
+        Returns:
+            List of stemmed words and list of removed suffixes, both in the order of words
+        """
+        # Every distinct word is stemmed once, the repeats are answered from this batch's results
+        stem = self.stem
+        results_by_word = {word: stem(word) for word in dict.fromkeys(words)}
+        results = [results_by_word[word] for word in words]
+        return [stemmed for stemmed, _ in results], [ending for _, ending in results]
+
+# Shared instance for stem(). Stemmer keeps the current word in its attributes, so it must not be used by several threads at once
+_default_stemmer = Stemmer()
+
+def stem(word):
+    """Stem the given word with the shared Stemmer, so callers do not need an instance of their own.
+    
+    Args:
+        word: String to stem
+        
+    Returns:
+        Stemmed word and the removed suffix
+    """
+    return _default_stemmer.stem(word)
+
+def _stem_sentence(sentence):
+    """Stem the words of one sentence with the shared Stemmer; runs in the worker processes of stem_corpus."""
+    return [_default_stemmer.stem(word) for word in sentence]
+
+def stem_corpus(sentences, workers=None):
+    """Stem many sentences, optionally spread over several processes.
+    
+    Args:
+        sentences: List of sentences, each a list of words
+        workers: Number of worker processes. None or 1 stems in this process, as NLP.process in main.py
+        
+    Returns:
+        List with one list of (stem, removed suffix) pairs per sentence, in the order of sentences
+    """
+    if workers is not None and workers > 1:
+        # Sentences are independent. Every worker fills the cache of its own shared Stemmer, map keeps the order
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(_stem_sentence, sentences, chunksize=256))
+    return [_stem_sentence(sentence) for sentence in sentences]
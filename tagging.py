@@ -1,4 +1,5 @@
 import dictionaries
+import stemmer
 from enum import Enum
 import logging
 
@@ -16,6 +17,29 @@ class Tag(Enum):
     PUNCTUATION = 'punctuation'
     UNCERTAIN = 'uncertain'
 
+# The tag strings, so the rules do not go through the enum on every return
+_T_NOUN = Tag.NOUN.value
+_T_VERB = Tag.VERB.value
+_T_ADJ = Tag.ADJECTIVE.value
+_T_ADV = Tag.ADVERB.value
+_T_PRON = Tag.PRONOUN.value
+_T_DET = Tag.DETERMINER.value
+_T_PREP = Tag.PREPOSITION.value
+_T_CONJ = Tag.CONJUNCTION.value
+_T_INTERJ = Tag.INTERJECTION.value
+_T_NUM = Tag.NUMBER.value
+_T_PUNCT = Tag.PUNCTUATION.value
+_T_UNCERTAIN = Tag.UNCERTAIN.value
+
+# Word sets of the tagging rules, built once instead of on every check
+_PUNCT = frozenset('.,?!:;-')
+_AUX_AFTER = frozenset({'to', 'will', 'can', 'must', 'should', 'would', 'could', 'may', 'might'})
+_INTENSIFIERS = frozenset({'veri', 'quite', 'rather', 'extremely'}) # 'veri' is the stem of 'very'
+_INTERJECTIONS = frozenset({'oh', 'wow', 'hey', 'uh', 'um'})
+_COPULA = frozenset({'is', 'am', 'be'})
+_PASSIVE_AUX = frozenset({'is', 'are', 'was', 'were'})
+_BY_WITH = frozenset({'by', 'with'})
+
 class Tagging:
     """Tagging class for tagging words in context.
 
@@ -27,11 +51,49 @@ class Tagging:
 
     Pattern matching (_is_is_pattern()), _get_pattern_tag()), comments and formating done by AI
     """
+    # Endings that give the tag on their own; -ing and -ed also depend on the previous word
+    _ENDING_TAG = {
+        'ly': _T_ADV,
+        'tion': _T_NOUN,
+        'able': _T_ADJ,
+        'ible': _T_ADJ,
+        'ic': _T_ADJ,
+        'al': _T_ADJ,
+        'es': _T_VERB,
+    }
+
     def __init__(self, patterns):
         self.patterns = patterns
         self.sentence_connectors = frozenset(['and', 'but', 'or', 'nor', 'for', 'yet', 'so'])  # Add sentence connectors
         self.sentence_amount = 0
         self.list_of_sentences = []   
+        # Tags that only depend on the word itself, one lookup instead of a membership test per category.
+        # Filled in the order the categories used to be checked, so a word in two categories keeps the first one
+        self._direct = {}
+        for key, tag in (('determiners', _T_DET), ('prepositions', _T_PREP),
+                         ('conjunctions', _T_CONJ), ('pronouns', _T_PRON)):
+            for pattern_word in patterns[key]:
+                self._direct.setdefault(pattern_word, tag)
+        for punctuation in _PUNCT:
+            self._direct.setdefault(punctuation, _T_PUNCT)
+        # Every form of every irregular verb; 'base' holds a single form as a string, the others a list of forms.
+        # Tagged words are stems, so the stem of every form is added as well ('ha' of 'has', 'choos' of 'chose')
+        irregular_forms = set()
+        for time_forms in dictionaries.irregular_verbs.values():
+            for forms in time_forms.values():
+                irregular_forms.update([forms] if isinstance(forms, str) else forms)
+        form_stemmer = stemmer.Stemmer()
+        irregular_forms.update([form_stemmer.stem(form)[0] for form in irregular_forms])
+        self._adverbs = frozenset(dictionaries.adverbs)
+        # Tags from the word lists for _fallback_tagging, filled in the order the lists used to be checked:
+        # verbs before nouns before adjectives before adverbs, the irregular verb forms last
+        self._fallback_map = {}
+        for words, tag in ((dictionaries.verbs, _T_VERB), (dictionaries.irregular_verbs, _T_VERB),
+                           (dictionaries.irregular_verbs_list, _T_VERB), (dictionaries.nouns, _T_NOUN),
+                           (dictionaries.adjectives, _T_ADJ), (dictionaries.adverbs, _T_ADV),
+                           (irregular_forms, _T_VERB)):
+            for dictionary_word in words:
+                self._fallback_map.setdefault(dictionary_word, tag)
 
     def _tag_word_in_context(self, word, prev_word, next_word, prev_prev_word, next_next_word, tagged_words):
         """Tag the word in context.
@@ -48,171 +110,124 @@ class Tagging:
             Tag of the word
         """
         # First check for auxiliary verbs and common verb forms
-        try:
-            logging.info(tagged_words)
-            if self._is_number(word):
-                return Tag.NUMBER.value
-            logging.debug("Checking for determiner")
-            if self._is_determiner(word):
-                return Tag.DETERMINER.value
-            logging.debug("Checked for determiner")
-            if self._is_preposition(word):
-                return Tag.PREPOSITION.value
-            logging.debug("Checked for preposition")
-            if self._is_conjunction(word):
-                return Tag.CONJUNCTION.value
-            logging.debug("Checked for conjunction")
-            if self._is_pronoun(word):
-                return Tag.PRONOUN.value
-            logging.debug("Checked for pronoun")
-            if word in ['.', ',', '?', '!', ':', ';', '-']:
-                return Tag.PUNCTUATION.value
-            logging.debug("Punctuation checked")
-            if self._is_adjective(word, prev_word, tagged_words):
-                return Tag.ADJECTIVE.value
-            logging.debug("Adjective checked")
-            if prev_word is not None and self._is_verb(word, prev_word, tagged_words):
-                return Tag.VERB.value
-            logging.debug(f"Checked for verb for word '{word}'")
-            if self._is_adjective_after_adverb(word, prev_word, tagged_words):
-                return Tag.ADJECTIVE.value
-            if self._is_noun_after_preposition(next_word, next_next_word):
-                return Tag.NOUN.value
-            if self._is_sentence_connection(tagged_words, word, prev_word, prev_prev_word) and 'tag' in tagged_words[prev_prev_word]:
-                return tagged_words[prev_prev_word]['tag']
-            if self._is_verb_after_verb(tagged_words, prev_word, prev_prev_word):
-                return Tag.VERB.value
-            if self._is_adverb_after_verb(word, prev_word, tagged_words, prev_prev_word):
-                return Tag.ADVERB.value
-            if self._is_interjection(word):
-                return Tag.INTERJECTION.value
-            if self._get_tag_by_ending(word, prev_word, tagged_words) != False:
-                logging.info(self._get_tag_by_ending(word, prev_word, tagged_words))
-                logging.info(tagged_words)
-                return self._get_tag_by_ending(word, prev_word, tagged_words)
-            logging.debug("Tagging by ending checked")
-
-            return self._fallback_tagging(word, prev_word, next_word)
-        except Exception as e:
-            logging.warning(f"Error tagging '{word}: {str(e)}")
-
-    def _is_adjective(self, word, prev_word, tagged_words):
-        return prev_word in set(["is", "am", "be"]) and tagged_words[word]['ending'] != 'ing'
-
-    def _is_verb(self, word, prev_word, tagged_words):
-        logging.debug("Checking for verb")
-        return tagged_words[prev_word]['tag'] == Tag.PRONOUN.value
-
-    def _get_tag_by_ending(self, word, prev_word, tagged_words):
+        if self._is_number(word):
+            return _T_NUM
+        # Determiners, prepositions, conjunctions, pronouns and punctuation
+        direct_tag = self._direct.get(word)
+        if direct_tag is not None:
+            return direct_tag
+        # Looked up once here, the checks below only get the records they need.
+        # A word without a record is tagged as a word without ending
+        word_record = tagged_words.get(word)
+        ending = word_record.get('ending') if word_record is not None else None
+        prev_record = tagged_words.get(prev_word) # None at the start of the sentence
+        prev_prev_record = tagged_words.get(prev_prev_word)
+        if self._is_adjective(prev_word, ending):
+            return _T_ADJ
+        if self._is_verb(prev_record):
+            return _T_VERB
+        if self._is_adjective_after_adverb(prev_word, ending):
+            return _T_ADJ
+        if self._is_noun_after_preposition(next_word, next_next_word):
+            return _T_NOUN
+        # _is_sentence_connection already checks that prev_prev_word has a tag
+        if self._is_sentence_connection(prev_word, prev_prev_record):
+            return prev_prev_record['tag']
+        if self._is_verb_after_verb(prev_record, prev_prev_record):
+            return _T_VERB
+        # Only adverbs can be adverbs after a verb; most words skip the call
+        if word in self._adverbs and self._is_adverb_after_verb(prev_record, prev_prev_record):
+            return _T_ADV
+        if self._is_interjection(word):
+            return _T_INTERJ
+        ending_tag = self._get_tag_by_ending(ending, prev_record)
+        if ending_tag is not None:
+            return ending_tag
+
+        return self._fallback_tagging(word, prev_word, next_word)
+
+    def _is_adjective(self, prev_word, ending):
+        return prev_word in _COPULA and ending != 'ing'
+
+    def _is_verb(self, prev_record):
+        return prev_record is not None and prev_record.get('tag') == _T_PRON
+
+    def _get_tag_by_ending(self, ending, prev_record):
         """Helper method to get the tag based on the word ending.
         
         Args:
-            word: String containing the word to tag
-            prev_word: String containing the previous word
-            tagged_words: Dictionary containing tagged words
+            ending: String containing the ending the stemmer removed from the word
+            prev_record: Dictionary of the previous word, None at the start of the sentence
             
         Returns:
-            Tag of the word
+            Tag of the word, None if the ending gives no tag
         """ 
-        try:
-            logging.debug("Trying to tag by ending")
-            if tagged_words[word]['ending'] == 'ly':
-                return Tag.ADVERB.value
-            elif tagged_words[word]['ending'] == 'tion':
-                return Tag.NOUN.value
-            elif tagged_words[word]['ending'] == 'able' or tagged_words[word]['ending'] == 'ible'or tagged_words[word]['ending'] == 'ic' or tagged_words[word]['ending'] == 'al':
-                return Tag.ADJECTIVE.value
-            elif tagged_words[word]['ending'] == 'es':
-                return Tag.VERB.value
-            elif tagged_words[word]['ending'] == 'ing' or tagged_words[word]['ending'] == 'ed':
-                if tagged_words[prev_word]['tag'] != 'determiner':
-                    return Tag.VERB.value
-                return Tag.ADJECTIVE.value                
-            else:
-                return False
-        except Exception as e:
-            logging.warning(f"Failed to tag by ending: {str(e)}")
+        ending_tag = self._ENDING_TAG.get(ending)
+        if ending_tag is not None:
+            return ending_tag
+        # -ing and -ed need the previous word to tell verbs from adjectives
+        if (ending == 'ing' or ending == 'ed') and prev_record is not None:
+            if prev_record.get('tag') != _T_DET:
+                return _T_VERB
+            return _T_ADJ                
+        return None
 
     def _is_number(self, word):
         return word.isdigit()
 
-    def _is_determiner(self, word):
-        return word in self.patterns['determiners']
-
-    def _is_preposition(self, word):
-        return word in self.patterns['prepositions']
-
-    def _is_conjunction(self, word):
-        return word in self.patterns['conjunctions']
-
-    def _is_pronoun(self, word):
-        return word in self.patterns['pronouns']
-
     def _is_auxiliary_after(self, word):
-        return word in set({'to', 'will', 'can', 'must', 'should', 'would', 'could', 'may', 'might'})
+        return word in _AUX_AFTER
 
-    def _is_adjective_after_adverb(self, word, prev_word, tagged_words):
-        return prev_word in set({'veri', 'quite', 'rather', 'extremely'}) and tagged_words[word]['ending'] != 'ly'
+    def _is_adjective_after_adverb(self, prev_word, ending):
+        return prev_word in _INTENSIFIERS and ending != 'ly'
 
     def _is_noun_after_preposition(self, next_word, next_next_word):
         return next_word in dictionaries.patterns['prepositions'] and next_next_word in dictionaries.patterns['determiners']
 
-    def _is_sentence_connection(self, tagged_words, word, prev_word, prev_prev_word):
-        if (prev_word is not None and prev_prev_word is not None and 
+    def _is_sentence_connection(self, prev_word, prev_prev_record):
+        if (prev_word is not None and 
             prev_word in self.sentence_connectors and 
-            prev_prev_word in tagged_words and
-            'tag' in tagged_words[prev_prev_word]):
+            prev_prev_record is not None and
+            'tag' in prev_prev_record):
             return True
         return False
 
-    def _is_verb_after_verb(self, tagged_words, prev_word, prev_prev_word):
-        if (prev_word is not None and prev_prev_word is not None and 
-            prev_word in tagged_words and prev_prev_word in tagged_words and
-            'ending' in tagged_words[prev_word] and 'tag' in tagged_words[prev_prev_word] and
-            tagged_words[prev_word]['ending'] == 'ing' and tagged_words[prev_prev_word]['tag'] == Tag.VERB.value):
+    def _is_verb_after_verb(self, prev_record, prev_prev_record):
+        if (prev_record is not None and prev_prev_record is not None and 
+            prev_record.get('ending') == 'ing' and prev_prev_record.get('tag') == _T_VERB):
             return True
         return False
 
-    def _is_adverb_after_verb(self, word, prev_word, tagged_words, prev_prev_word):
-        """Check if word is an adverb that comes after a verb
+    def _is_adverb_after_verb(self, prev_record, prev_prev_record):
+        """Check if an adverb comes after a verb. The caller checks that the word is in dictionaries.adverbs
         
         Args:
-            word: String containing the word to tag
-            prev_word: String containing the previous word
-            tagged_words: Dictionary containing tagged words
-            prev_prev_word: String containing the previous previous word
+            prev_record: Dictionary of the previous word, None at the start of the sentence
+            prev_prev_record: Dictionary of the previous previous word, None if there is none
             
         Returns:
-            True if the word is an adverb that comes after a verb, False otherwise
+            True if the adverb comes after a verb, False otherwise
         """
         # First check if we have valid previous word data
-        if not prev_word or prev_word not in tagged_words:
-            return False
-            
-        # Check if current word is in adverbs dictionary
-        if word not in dictionaries.adverbs:
+        if prev_record is None:
             return False
             
         # Simple case: word is after a verb
-        if ('tag' in tagged_words[prev_word] and 
-            tagged_words[prev_word]['tag'] == Tag.VERB.value):
+        if prev_record.get('tag') == _T_VERB:
             return True
             
         # Complex case: check prev_prev_word pattern
-        if (prev_prev_word and 
-            prev_prev_word in tagged_words and 
-            'ending' in tagged_words[prev_prev_word] and
-            'tag' in tagged_words[prev_word] and 
-            'ending' in tagged_words[prev_word] and
-            tagged_words[prev_prev_word]['ending'] == 'ing' and 
-            tagged_words[prev_word]['tag'] == Tag.VERB.value and 
-            tagged_words[prev_word]['ending'] != 'ing'):
+        if (prev_prev_record is not None and 
+            'ending' in prev_record and
+            prev_prev_record.get('ending') == 'ing' and 
+            prev_record.get('tag') == _T_VERB and 
+            prev_record['ending'] != 'ing'):
             return True
             
         return False
 
     def _is_interjection(self, word):
-        return word in set({'oh', 'wow', 'hey', 'uh', 'um'})
+        return word in _INTERJECTIONS
 
     def _fallback_tagging(self, word, prev_word, next_word):
         """Fallback tagging logic with additional context awareness.
@@ -225,26 +240,13 @@ class Tagging:
         Returns:
             Tag of the word
         """
-        if word in dictionaries.verbs or word in dictionaries.irregular_verbs or word in dictionaries.irregular_verbs_list:
-            return Tag.VERB.value
-        elif word in dictionaries.nouns:
-            return Tag.NOUN.value
-        elif word in dictionaries.adjectives:
-            return Tag.ADJECTIVE.value
-        elif word in dictionaries.adverbs:
-            return Tag.ADVERB.value
-        elif word in dictionaries.adjectives and prev_word in {'very', 'quite', 'rather'}:
-            return Tag.ADJECTIVE.value
-        elif word in dictionaries.irregular_verbs:
-            return Tag.VERB.value
-        for irregular_verb in dictionaries.irregular_verbs:
-            for time_form in dictionaries.irregular_verbs[irregular_verb]:
-                if word in dictionaries.irregular_verbs[irregular_verb][time_form]:
-                    return Tag.VERB.value
+        fallback_tag = self._fallback_map.get(word)
+        if fallback_tag is not None:
+            return fallback_tag
         return self._additional_contextual_patterns(prev_word, next_word)
 
     def _additional_contextual_patterns(self, prev_word, next_word):
-        if prev_word is not None and prev_word in {'is', 'are', 'was', 'were'} and next_word is not None and next_word in {'by', 'with'}:
-            return Tag.VERB.value
+        if prev_word is not None and prev_word in _PASSIVE_AUX and next_word is not None and next_word in _BY_WITH:
+            return _T_VERB
         logging.info("The tag was given by exclusion")
-        return Tag.UNCERTAIN.value  # Default to uncertain if no pattern matches
\ No newline at end of file
+        return _T_UNCERTAIN  # Default to uncertain if no pattern matches
\ No newline at end of file
@@ -0,0 +1,40 @@
+import io
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+from tagged_json import iter_json_array
+
+
+class IterJsonArrayTest(unittest.TestCase):
+    """Items cut at a chunk boundary must come out as if the file was read at once."""
+
+    VALID = [
+        '[1.5]',
+        '[2.5, 3.25e-3]',
+        '[12345, -0.5E+2 , 1e10]',
+        '["a\\"b", "x,y]", true, null, false]',
+        '[[{"word": "this", "tag": "pronoun"}, {"word": "is", "tag": 1.25}], []]',
+        ' [ ] ',
+    ]
+
+    INVALID = ['{"a": 1}', '[1,]', '[1 2]', '[1', '', '[1x]', '[1.]']
+
+    def test_small_chunks(self):
+        for text in self.VALID:
+            for chunk_size in range(1, 9):
+                with self.subTest(text=text, chunk_size=chunk_size):
+                    self.assertEqual(list(iter_json_array(io.StringIO(text), chunk_size)), json.loads(text))
+
+    def test_invalid(self):
+        for text in self.INVALID:
+            for chunk_size in (1, 2, 3, 64):
+                with self.subTest(text=text, chunk_size=chunk_size):
+                    with self.assertRaises(ValueError):
+                        list(iter_json_array(io.StringIO(text), chunk_size))
+
+
+if __name__ == "__main__":
+    unittest.main()
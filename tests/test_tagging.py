@@ -0,0 +1,34 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import dictionaries
+import tagging
+
+
+class IrregularVerbFallbackTest(unittest.TestCase):
+    """Irregular verb forms and their stems are verbs, parts of them are not."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tagging = tagging.Tagging(dictionaries.patterns)
+
+    def fallback(self, word):
+        return self.tagging._fallback_tagging(word, None, None)
+
+    def test_forms_and_stems(self):
+        # 'ha', 'wa', 'sai' and 'choos' are the stems of 'has', 'was', 'said' and 'chose'
+        for word in ('be', 'was', 'been', 'has', 'chose', 'ha', 'wa', 'sai', 'choos'):
+            with self.subTest(word=word):
+                self.assertEqual(self.fallback(word), tagging.Tag.VERB.value)
+
+    def test_parts_of_base_forms(self):
+        # Substrings of base forms ('know', 'take', 'have') used to be tagged as verbs
+        for word in ('no', 't', 'e', 'av'):
+            with self.subTest(word=word):
+                self.assertEqual(self.fallback(word), tagging.Tag.UNCERTAIN.value)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import os
+import sys
+import tempfile
+import unittest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+import viterbi
+
+
+class ReadParamsTest(unittest.TestCase):
+    """Bad parameter files are logged and leave the current parameters in place."""
+
+    def setUp(self):
+        self.viterbi = viterbi.Viterbi()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def assert_kept_params(self, path):
+        logE = self.viterbi.logE
+        with self.assertLogs(level="WARNING"):
+            self.viterbi.read_params(path)
+        self.assertIs(self.viterbi.logE, logE)
+        self.assertEqual(len(self.viterbi.tag(["the", "dog", "barks", "."])), 4)
+
+    def test_truncated_npz(self):
+        with open(os.path.join(REPO, "hmm_probabilities.npz"), "rb") as f:
+            data = f.read()
+        path = os.path.join(self.tmp.name, "truncated.npz")
+        with open(path, "wb") as f:
+            f.write(data[:len(data) // 2])
+        self.assert_kept_params(path)
+
+    def test_garbage_npz(self):
+        path = os.path.join(self.tmp.name, "garbage.npz")
+        with open(path, "wb") as f:
+            f.write(b"PK\x03\x04 this is not a zip archive")
+        self.assert_kept_params(path)
+
+    def test_unreadable_npz(self):
+        # A directory cannot be opened as a file
+        path = os.path.join(self.tmp.name, "directory.npz")
+        os.mkdir(path)
+        self.assert_kept_params(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
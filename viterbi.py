@@ -2,6 +2,15 @@ import json
 import math
 import re
 import logging
+import zipfile
+import numpy as np
+
+SMOOTHING = 1e-6 # Probability used for anything the parameters do not cover
+UNK_TOKEN = "<UNK>" # Stands in for rare words during training (see HMM.py)
+
+# Compiled once at import, as in main.py
+_SENT_RE = re.compile('([.!?])')
+_WORD_RE = re.compile(r"\b[\w']+\b|[.,?!]")
 
 class Viterbi():
     def __init__(self):
@@ -24,34 +33,76 @@ class Viterbi():
             "VERB",  # Verb
             "X"      # Other
         ]
-        # Default values. Empty.
-        self.observations = set()
-        self.start_prob = {}
-        self.trans_prob = {}
-        self.emit_prob = {}
-        self.total_words = 0
-        self.total_first_words = 0
-        self.total_transitions = 0
-        self.tag_counts = {}
+        # Default values. Empty: every probability falls back to SMOOTHING.
+        self.word_idx = {} # Word -> column of logE
+        self.log_start = np.full(len(self.UPOS_TAGS), math.log(SMOOTHING), dtype=np.float32)
+        self.logA = np.full((len(self.UPOS_TAGS), len(self.UPOS_TAGS)), math.log(SMOOTHING), dtype=np.float32)
+        self.logA_T = np.ascontiguousarray(self.logA.T) # Row j holds logA[:, j]
+        self.logE = np.full((len(self.UPOS_TAGS), 1), math.log(SMOOTHING), dtype=np.float32)
+        self.logE_T = np.ascontiguousarray(self.logE.T) # Row w holds logE[:, w]
+        self.unk_idx = 0 # Column of logE used for words that are not in word_idx
         # Pretrained params fromm HMM.py
         self.read_params()
 
-    def read_params(self, filepath="hmm_probabilities.json"):
+    def read_params(self, filepath="hmm_probabilities.npz"):
+        """
+        Reads the parameters written by HMM.write_params. NPZ files hold the probability arrays, JSON files the nested dicts.
+        The probabilities are kept as float32 log-probability matrices, rows and columns in the order of UPOS_TAGS.
+        """
         logging.debug("reading params...")
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                loaded_params = json.load(f)
-                
-                self.observations = set(loaded_params.get('observations', []))
-                self.start_prob = loaded_params.get('start_prob', {})
-                self.trans_prob = loaded_params.get('trans_prob', {})
-                self.emit_prob = loaded_params.get('emit_prob', {})
-                logging.info(f"HMM parameters loaded from {filepath}")
+            if filepath.endswith(".npz"):
+                with np.load(filepath) as loaded_params:
+                    states = loaded_params['states'].tolist()
+                    observations = loaded_params['vocab'].tolist()
+                    start_prob = loaded_params['start']
+                    trans_prob = loaded_params['trans']
+                    emit_prob = loaded_params['emit']
+            else:
+                with open(filepath, 'r', encoding='utf-8') as f:
+                    loaded_params = json.load(f)
+
+                states = self.UPOS_TAGS
+                observations = loaded_params.get('observations', [])
+                # Turn the nested dicts into matrices; anything missing gets the smoothing value
+                start = loaded_params.get('start_prob', {})
+                trans = loaded_params.get('trans_prob', {})
+                emit = loaded_params.get('emit_prob', {})
+                start_prob = np.array([start.get(tag, SMOOTHING) for tag in states])
+                trans_prob = np.array([[trans.get(prev_tag, {}).get(tag, SMOOTHING) for tag in states] for prev_tag in states])
+                emit_prob = np.array([[emit.get(tag, {}).get(word, SMOOTHING) for word in observations] for tag in states]).reshape(len(states), len(observations))
+            self._set_params(states, observations, start_prob, trans_prob, emit_prob)
+            logging.info(f"HMM parameters loaded from {filepath}")
 
         except FileNotFoundError:
             logging.warning(f"Warning: {filepath} not found. Initializing with empty parameters.")
-        except json.JSONDecodeError:
+        # json.JSONDecodeError is a ValueError; np.load raises ValueError/KeyError on bad NPZ files and BadZipFile on
+        # truncated ones; OSError covers files that cannot be read at all
+        except (ValueError, KeyError, zipfile.BadZipFile, OSError):
             logging.warning(f"Error: Could not decode {filepath}. File might be corrupted. Initializing with empty parameters.")
+
+    def _set_params(self, states, observations, start_prob, trans_prob, emit_prob):
+        """Stores the probability arrays as log-probabilities, reordered to UPOS_TAGS.
+
+        Args:
+            states: Tags in the order of the rows (and transition columns) of the arrays
+            observations: Words in the order of the emission columns
+            start_prob: (N,) start probabilities
+            trans_prob: (N, N) transition probabilities, previous tag x current tag
+            emit_prob: (N, V) emission probabilities, tag x word
+        """
+        order = [states.index(tag) for tag in self.UPOS_TAGS]
+        self.word_idx = {word: i for i, word in enumerate(observations)}
+        self.log_start = np.log(np.asarray(start_prob, dtype=np.float32)[order])
+        self.logA = np.log(np.asarray(trans_prob, dtype=np.float32)[np.ix_(order, order)])
+        # Transposed copy for tag(): the max over previous tags then runs along contiguous memory
+        self.logA_T = np.ascontiguousarray(self.logA.T)
+        # The extra last column holds the smoothing value for words the model has never seen
+        emit_prob = np.asarray(emit_prob, dtype=np.float32)[order]
+        self.logE = np.log(np.hstack([emit_prob, np.full((len(order), 1), SMOOTHING, dtype=np.float32)]))
+        # Word-major copy for tag(): the emission scores of one word are a contiguous row
+        self.logE_T = np.ascontiguousarray(self.logE.T)
+        self.unk_idx = self.word_idx.get(UNK_TOKEN, len(observations))
     
     def process(self, text):
         """
@@ -65,11 +116,11 @@ class Viterbi():
             raise ValueError("Input must not be empty")
         
         # This will split on '.', '!', and '?' while preserving the punctuation. Empty strings will be ignored.
-        sentences = re.split('([.!?])', text)
+        sentences = _SENT_RE.split(text)
         tagged_text = []
         # Sentences is a list of substrings, one for every sentence in the input.
         for sentence_part in sentences:
-            words = re.findall(r"\b[\w']+\b|[.,?!]", sentence_part.lower())
+            words = _WORD_RE.findall(sentence_part.lower())
             # Handling of processed sentences by AI.
             if words:
                 tags = self.tag(words)
@@ -77,61 +128,40 @@ class Viterbi():
         return tagged_text
 
     def tag(self, words):
-        trellis = [{}] # Viterbi data structure. No idea why its called that.
-        backpointers = [{}] # List of dictionaries for backtracking the best tags
+        """Finds the most likely tag sequence for a list of words.
 
-        first_word = words[0]
-        for tag in self.UPOS_TAGS:
-            start_prob = self.start_prob.get(tag, 1e-6) # Get start probability, if not available set to a low smoothing number.
-            emit_prob = self.emit_prob.get(tag, {}).get(first_word, 1e-6) # Get emission probability, if not available set to a low smoothing number.
+        The trellis is filled in log space one word at a time: for every current tag the best previous tag is the
+        argmax over delta + logA (stored transposed), so each step is one (N, N) NumPy reduction instead of N*N dict lookups.
 
-            # Calculate the likelihood of the first word in logarithms
-            trellis[0][tag] = math.log(start_prob) + math.log(emit_prob)
-            # Set the backpointer to None -> No previous tag since its the first word
-            backpointers[0][tag] = None
+        Args:
+            words: List of lowercased words of one sentence
 
-        # Recursion
-        for t in range(1, len(words)):
-            # For every word in the sentence, create a new dictionary to store its values in
-            trellis.append({})
-            backpointers.append({})
-            current_word = words[t]
-
-            for current_tag in self.UPOS_TAGS:
-                # Logs work in negative values, the lowest negative value is -inf
-                # Maximum probability of a path
-                max_prob = -math.inf
-                # There hasn't been a previous tag yet -> No best previous tag
-                best_prev_tag = None
-
-                # Iterate over all possible previous tags (only the previous word's tag)
-                for prev_tag in self.UPOS_TAGS:
-                    # Get the transition probability from the previous tag to the current tag (for every possible previous tag)
-                    trans_prob = self.trans_prob.get(prev_tag, {}).get(current_tag, 1e-6)
-
-                    # Calculate the path probability by adding the previous tag's probability and the transition (log-) probability
-                    path_prob = trellis[t-1][prev_tag] + math.log(trans_prob)
-                    # If the path probability is higher than the current max, update the max and best previous tag
-                    if path_prob > max_prob:
-                        max_prob = path_prob
-                        best_prev_tag = prev_tag
-
-                # Get the emission probability of the current word
-                emission_prob = self.emit_prob.get(current_tag, {}).get(current_word, 1e-6)
-                # Calculate the path probability by adding the current tag's probability and the emission (log-) probability
-                trellis[t][current_tag] = max_prob + math.log(emission_prob)
-                # Set the backpointer to the best previous tag
-                backpointers[t][current_tag] = best_prev_tag
-
-        # Find the best last tag (the tag with the highest probability to be the last tag)
-        best_last_tag = max(trellis[-1], key=trellis[-1].get)
+        Returns:
+            List of UPOS tags, one per word
+        """
+        word_idx = self.word_idx
+        unk_idx = self.unk_idx
+        obs_idx = np.fromiter((word_idx.get(word, unk_idx) for word in words), dtype=np.int64, count=len(words))
+        # Emission scores of the sentence, gathered once: row t holds logE[:, obs_idx[t]]
+        logE_obs = self.logE_T[obs_idx]
+        backpointers = np.zeros((len(words), len(self.UPOS_TAGS)), dtype=np.int32) # Best previous tag for every word and tag
+        logA_T = self.logA_T
+        scores = np.empty_like(logA_T) # Reused for every word instead of allocating a new (N, N) array per step
 
-        # Create a list of the best path
-        best_path = [best_last_tag]
+        # Likelihood of the first word for every tag
+        delta = self.log_start + logE_obs[0]
+        for t in range(1, len(words)):
+            # scores[j, i]: best path ending in tag i at t-1, followed by tag j
+            np.add(logA_T, delta[None, :], out=scores)
+            scores.argmax(1, out=backpointers[t])
+            scores.max(1, out=delta)
+            delta += logE_obs[t]
 
-        # Iterate over the words in reverse order (Viterbi stores the path "the wrong way around")
+        # Follow the backpointers from the best last tag (Viterbi stores the path "the wrong way around")
+        best = int(delta.argmax())
+        best_path = [best]
         for t in range(len(words) - 1, 0, -1):
-            best_last_tag = backpointers[t][best_last_tag]
-            best_path.insert(0, best_last_tag)
+            best = int(backpointers[t, best])
+            best_path.append(best)
 
-        return best_path
\ No newline at end of file
+        return [self.UPOS_TAGS[i] for i in reversed(best_path)]